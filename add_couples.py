@@ -6,7 +6,7 @@ couples.
 
 import sys
 
-from pyhrtc.instance import read_hrtc
+from pyhrtc.fileio import read_hrtc
 
 def usage(script_name):
     """Prints usage info."""
@@ -20,7 +20,7 @@ def main(args):
     if len(args) != 4:
         usage(args[0])
     instance = read_hrtc(args[1])
-    instance.make_couple_from_doctor_pair(int(args[3]))
+    instance.make_couple_from_agent_pair_on_left(int(args[3]))
     instance.write_to_file(args[2])
 
 
@@ -1,18 +1,35 @@
 """Contains some calls to algorithms from 3rd parties.
-"""
 
-from networkx import Graph as NxGraph, connected_components
-from networkx.algorithms.bipartite import maximum_matching
-from networkx.algorithms.components import is_connected
-from networkx.algorithms.matching import max_weight_matching as nx_max_weight
+networkx is slow to import, so it is only imported by the functions that use
+it.
+"""
 
 from pyhrtc.weightedinstance import WeightedInstance
 
 
 def connected_component_subgraphs(graph):
+    from networkx import connected_components
     for nodes in connected_components(graph):
         yield graph.subgraph(nodes)
 
+
+def _add_right_nodes(graph, instance):
+    """Add one node to graph for each unit of capacity of each agent on the
+    right of instance.
+
+    :return: A map from each right agent ID to the list of its node names
+    :rtype: dict
+    """
+    right_nodes = {}
+    for right in instance.single_agents_right:
+        nodes = [f"r{right.ident}_{cap}"
+                 for cap in range(right.capacity)]
+        for node in nodes:
+            graph.add_node(node, bipartite=1)
+        right_nodes[right.ident] = nodes
+    return right_nodes
+
+
 def max_card_matching(instance):
     """Given an instance, calculate the cardinality of the biggest matching.
     Note that this matching need not be, and probably won't be, stable.
@@ -22,24 +39,23 @@ def max_card_matching(instance):
     :rtype: int
     :return: The size of the largest cardinality matching.
     """
+    from networkx import Graph as NxGraph
+    from networkx.algorithms.bipartite import maximum_matching
     graph = NxGraph()
     if instance.number_of_couples_left() != 0:
         raise Exception("max card matching does not currently support couples")
-    for left in instance.single_agents_left:
-        graph.add_node(f"l%s" % left.ident, bipartite=0)
-    for right in instance.single_agents_right:
-        for cap in range(right.capacity):
-            graph.add_node(f"r%s_%d" % (right.ident, cap), bipartite=1)
-    for left in instance.single_agents_left:
+    left_nodes = [f"l{left.ident}" for left in instance.single_agents_left]
+    graph.add_nodes_from(left_nodes, bipartite=0)
+    right_nodes = _add_right_nodes(graph, instance)
+    for left_node, left in zip(left_nodes, instance.single_agents_left):
         for pref_group in left.preferences:
             for right_id in pref_group:
-                for cap in range(instance.single_agent_right(right_id).capacity):
-                    graph.add_edge(f"l%s" % left.ident,
-                                   f"r%s_%d" % (right_id, cap))
-    size = 0
-    for component in connected_component_subgraphs(graph):
-        size += len(maximum_matching(component))
-    return int(size/2)
+                for right_node in right_nodes[right_id]:
+                    graph.add_edge(left_node, right_node)
+    # Hopcroft-Karp can work on the whole graph at once, even if it is not
+    # connected, as long as it is told which side each node is on
+    matching = maximum_matching(graph, top_nodes=left_nodes)
+    return len(matching) // 2
 
 
 def max_weight_matching(instance):
@@ -54,22 +70,22 @@ def max_weight_matching(instance):
     """
     if not isinstance(instance, WeightedInstance):
         raise Exception("Max weight matching needs a WeightedInstance")
+    from networkx import Graph as NxGraph
+    from networkx.algorithms.matching import max_weight_matching as nx_max_weight
     graph = NxGraph()
     if instance.number_of_couples_left() != 0:
         raise Exception("Max weight matching does not "
                         "currently support couples")
     for left in instance.single_agents_left:
-        graph.add_node(f"l%s" % left.ident, bipartite=0)
-    for right in instance.single_agents_right:
-        for cap in range(right.capacity):
-            graph.add_node(f"r%s_%d" % (right.ident, cap), bipartite=1)
+        graph.add_node(f"l{left.ident}", bipartite=0)
+    right_nodes = _add_right_nodes(graph, instance)
     for left in instance.single_agents_left:
+        left_node = f"l{left.ident}"
         for pref_group in left.preferences:
             for right_id in pref_group:
-                for cap in range(instance.single_agent_right(right_id).capacity):
-                    graph.add_edge(f"l%s" % left.ident,
-                                   f"r%s_%d" % (right_id, cap),
-                                   weight=left.weight_of(right_id))
+                weight = left.weight_of(right_id)
+                for right_node in right_nodes[right_id]:
+                    graph.add_edge(left_node, right_node, weight=weight)
     weight = 0
     for component in connected_component_subgraphs(graph):
         for start, end in nx_max_weight(component):
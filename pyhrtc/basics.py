@@ -14,6 +14,9 @@ def grouped(things):
 class Agent():
     """An agent."""
 
+    __slots__ = ('_ident', '_capacity', '_preferences', '_num_preferences',
+                 '_preference_string', '_ranks')
+
     def __init__(self, ident, capacity=1):
         self._ident = ident
         self._capacity = capacity
@@ -21,15 +24,18 @@ class Agent():
         # tie group
         self._preferences = []
         self._num_preferences = None
+        self._preference_string = None
+        # Map from agent ID to rank, built when first needed
+        self._ranks = None
 
     def __str__(self):
         """A human readable string representation of this Agent.
         """
         return (f"Agent {self._ident} with preferences: "
-                 "{self.preference_string()}")
+                f"{self.preference_string()}")
 
     def __repr__(self):
-        return f"Agent:%s" % self._ident
+        return f"Agent:{self._ident}"
 
     @property
     def ident(self):
@@ -65,6 +71,10 @@ class Agent():
         """Return the preferences, as a list of tie groups. Entries which are
         not in a tie at all still appear by themselvs in a list (i.e. 1 (2 3)
         is [[1], [2, 3]]).
+
+        This is the list the agent itself uses, not a copy. Ranks and other
+        details are cached from it, so do not change it in place: assign a new
+        list to preferences instead.
         """
         return self._preferences
 
@@ -81,7 +91,29 @@ class Agent():
         passed in as [[1], [2, 3]].
         """
         self._preferences = new
+        self._preferences_changed()
+
+    def _preferences_changed(self):
+        """Forget anything cached about the preferences of this agent. This
+        must be called whenever the preferences are modified.
+        """
         self._num_preferences = None
+        self._preference_string = None
+        self._ranks = None
+
+    def _rank_table(self):
+        """A dictionary mapping each acceptable agent ID to its rank. This is
+        built the first time it is needed, and then kept until the preferences
+        change.
+        """
+        if self._ranks is None:
+            ranks = {}
+            for index, group in enumerate(self.preferences, start=1):
+                for ident in group:
+                    # If an agent is listed twice, its first rank counts
+                    ranks.setdefault(ident, index)
+            self._ranks = ranks
+        return self._ranks
 
     def rank_of(self, other):
         """Find the rank of other according to this agent. Note that ranks
@@ -91,10 +123,7 @@ class Agent():
             ident = other.ident
         else:
             ident = other
-        for index, group in enumerate(self.preferences, start=1):
-            if ident in group:
-                return index
-        return -1
+        return self._rank_table().get(ident, -1)
 
     def trim_after_worst(self, agents):
         """Given a set of agents, trim this agents preference list by removing
@@ -103,20 +132,37 @@ class Agent():
         :return: The number of preferences removed
         """
         removed = 0
-        while not [agent for agent in agents if agent in self.preferences[-1]]:
+        while not any(agent in self.preferences[-1] for agent in agents):
             removed += len(self.preferences.pop(-1))
+        if removed:
+            self._preferences_changed()
         return removed
 
+    def remove_preference(self, ident):
+        """Remove the agent identified by ident from the preferences of this
+        agent, dropping its tie group if nothing else is left in it.
+        :param ident: The ID of the agent to remove
+        """
+        # Build new lists rather than editing the old ones, see preferences
+        groups = ([other for other in group if other != ident]
+                  for group in self.preferences)
+        self._preferences = [group for group in groups if group]
+        self._preferences_changed()
+
     def position_of(self, other):
         """Find the position of other in this preference list. Note that this
         is not the same as rank, this function assumes an ordering on the
         elements within a tie, and gives an absolute count on the number of
-        agents before it.
+        agents before it. Note that positions start at 0.
         """
+        if isinstance(other, Agent):
+            ident = other.ident
+        else:
+            ident = other
         count = 0
         for group in self.preferences:
             for item in group:
-                if item == other.id:
+                if item == ident:
                     return count
                 count += 1
         return -1
@@ -136,12 +182,14 @@ class Agent():
         once "length" items have been added.
         """
         if length:
+            # sample() already returns the items in a random order
             chosen = random.sample(options, length)
         else:
             chosen = list(options)  # Copy so we don't shuffle the original
-        random.shuffle(chosen)
+            random.shuffle(chosen)
         # Reset preferences
         self._preferences = []
+        self._preferences_changed()
         current_tie = []
         for item in chosen:
             # If there is a tie, and we want to end it, do so;
@@ -159,6 +207,7 @@ class Agent():
         preferences once "length" items have been added.
         """
         chosen = []
+        options = set(options)
         for item in master_list:
             if item in options:
                 chosen.append(item)
@@ -166,6 +215,7 @@ class Agent():
                     break
         # Reset preferences
         self._preferences = []
+        self._preferences_changed()
         for item in chosen:
             self._preferences.append([item])
 
@@ -190,13 +240,16 @@ class Agent():
         """Is the given agent (as identified by their identifier) acceptable
         for this Agent?
         """
-        for tie in self.preferences:
-            if ident in tie:
-                return True
-        return False
+        return ident in self._rank_table()
 
     def preference_string(self):
-        """Returns the string of preferences for this agent."""
+        """Returns the string of preferences for this agent. The string is
+        remembered until the preferences change, which is why they must not
+        be edited in place (see preferences).
+        """
+        if self._preference_string is not None:
+            return self._preference_string
+
         def format_tie(tie_as_list):
             """Given a set of tied elements, returns a string representing
             them, by surrounding with brackets if there is more than one item.
@@ -206,13 +259,16 @@ class Agent():
             if len(tie_as_list) == 1:
                 return "%s" % tie_as_list[0]
             return "(%s)" % (" ".join(map(str, tie_as_list)))
-        return " ".join([format_tie(tie) for tie in self.preferences])
+        self._preference_string = " ".join([format_tie(tie)
+                                            for tie in self.preferences])
+        return self._preference_string
 
     def read_preferences(self, tokens):
         """Read in and assign preferences based on the given string.
         """
         # First reset preferences
         self._preferences = []
+        self._preferences_changed()
         in_tie = False
         current = []
         for token in tokens:
@@ -242,6 +298,8 @@ class Agent():
 class Couple(Agent):
     """Two agents together."""
 
+    __slots__ = ('_first', '_second')
+
     def __init__(self, first, second):
         super().__init__("(%s,%s)" % (first, second))
         self._first = first
@@ -258,6 +316,7 @@ class Couple(Agent):
         distinct lists of strings.
         """
         self._preferences = []
+        self._preferences_changed()
         for one, two in zip(tokens_a, tokens_b):
             self._preferences.append([int(one), int(two)])
 
@@ -266,6 +325,7 @@ class Couple(Agent):
         """
         # First reset preferences
         self._preferences = []
+        self._preferences_changed()
         in_tie = False
         current = []
         for token1, token2 in grouped(tokens):
@@ -291,7 +351,13 @@ class Couple(Agent):
                     current.append((token1, token2))
 
     def preference_string(self):
-        """Returns the string of preferences for this agent."""
+        """Returns the string of preferences for this agent. The string is
+        remembered until the preferences change, which is why they must not
+        be edited in place (see preferences).
+        """
+        if self._preference_string is not None:
+            return self._preference_string
+
         def format_tie(tie_as_list):
             """Given a set of tied elements, returns a string representing
             them, by surrounding with brackets if there is more than one item.
@@ -302,17 +368,18 @@ class Couple(Agent):
                 return "%s %s" % (tie_as_list[0][0], tie_as_list[0][1])
             return "(%s)" % (" ".join(["%s %s" % (c[0], c[1])
                                        for c in tie_as_list]))
-        return " ".join([format_tie(tie) for tie in self.preferences])
+        self._preference_string = " ".join([format_tie(tie)
+                                            for tie in self.preferences])
+        return self._preference_string
 
     def __str__(self):
         """A human readable string representation of this Agent.
         """
-        return (f"Agent (%s, %s) with preferences: %s" % (self._first,
-                                                          self._second,
-                                                          self.preference_string()))
+        return (f"Agent ({self._first}, {self._second}) with preferences: "
+                f"{self.preference_string()}")
 
     def __repr__(self):
-        return f"Agent:%s,%s" % (self._first, self._second)
+        return f"Agent:{self._first},{self._second}"
 
     @staticmethod
     def from_two_agents(agent1: Agent, agent2: Agent):
@@ -342,6 +409,9 @@ class Instance():
     """An instance of HRTC.
     """
 
+    __slots__ = ('_single_agents_left', '_couples_left',
+                 '_single_agents_right')
+
     """A dict to hold all functions that can write Instances to a file.
     """
     instance_writers = {}
@@ -402,8 +472,10 @@ class Instance():
 
     @property
     def single_agents_left(self):
-        """Returns a list of all single agents on the left."""
-        return list(self._single_agents_left.values())
+        """Returns a view of all single agents on the left. This can be
+        iterated over, but not indexed; use list() on it if a list is needed.
+        """
+        return self._single_agents_left.values()
 
     @single_agents_left.setter
     def single_agents_left(self, new):
@@ -412,8 +484,10 @@ class Instance():
 
     @property
     def couples_left(self):
-        """Returns a list of all the couples on the left."""
-        return list(self._couples_left.values())
+        """Returns a view of all the couples on the left. This can be iterated
+        over, but not indexed; use list() on it if a list is needed.
+        """
+        return self._couples_left.values()
 
     @couples_left.setter
     def couples_left(self, new):
@@ -422,8 +496,10 @@ class Instance():
 
     @property
     def single_agents_right(self):
-        """Returns a list of all the single agents on the right."""
-        return list(self._single_agents_right.values())
+        """Returns a view of all the single agents on the right. This can be
+        iterated over, but not indexed; use list() on it if a list is needed.
+        """
+        return self._single_agents_right.values()
 
     @single_agents_right.setter
     def single_agents_right(self, new):
@@ -471,25 +547,20 @@ class Instance():
         while number:
             if len(self._single_agents_left) < 2:
                 raise LookupError("Don't have enough agents left")
-            id1, id2 = list(self._single_agents_left.keys())[-2:]
-            first = self._single_agents_left[id1]
-            second = self._single_agents_left[id2]
+            # Take the last two agents, newest first
+            _, second = self._single_agents_left.popitem()
+            _, first = self._single_agents_left.popitem()
             couple = Couple.from_two_agents(first, second)
             self._couples_left[couple.ident] = couple
-            del self._single_agents_left[id1]
-            del self._single_agents_left[id2]
             number -= 1
 
     def is_SMTI(self):
         """Returns true if this is an instance of SMTI (aka there are no
         couples, and each agent on the right has capacity 1.
         """
-        if self.number_of_couples_left() != 0:
-            return False
-        for agent in self.single_agents_right:
-            if agent.capacity != 1:
-                return False
-        return True
+        return (not self._couples_left and
+                all(agent.capacity == 1
+                    for agent in self._single_agents_right.values()))
 
     def write_to_file(self, filename, variant="Glasgow_HRTC_nocolon"):
         """Writes the instance to a file."""
@@ -559,18 +630,25 @@ class Instance():
         for single in these:
             positions = set()
             candidates = set()
+            # Running totals of the capacities of positions and candidates
+            positions_capacity = 0
+            candidates_capacity = 0
             # Go through agents in this preference list according to some
             # ordering.
             for each in order(single, self, positions, candidates, side):
-                positions.add(each)
+                each_agent = other_agent(each)
+                if each not in positions:
+                    positions.add(each)
+                    positions_capacity += each_agent.capacity
                 # Add anything that each thinks is at least as good as single
-                for group in other_agent(each).preferences:
+                for group in each_agent.preferences:
                     for agent in group:
-                        candidates.add(agent)
+                        if agent not in candidates:
+                            candidates.add(agent)
+                            candidates_capacity += these_agent(agent).capacity
                     if single.ident in group:
                         break
-                if (sum([other_agent(pos).capacity for pos in positions]) >=
-                    sum([these_agent(cand).capacity for cand in candidates])):
+                if positions_capacity >= candidates_capacity:
                     removed += single.trim_after_worst(positions)
                     self.clean_one(single, other)
         return removed
@@ -581,15 +659,11 @@ class Instance():
         through one set of agents, and only looks to remove one particular
         agent from a preference group.
         """
-        found = False
         for other in other_side:
-            for group in other.preferences:
-                if agent.ident in group and not agent.is_acceptable(other.ident):
-                    group.remove(agent.ident)
-                    found = True
-                    break
-            if found:
-                other.preferences = [group for group in other.preferences if group]
+            if agent.is_acceptable(other.ident):
+                continue
+            if other.is_acceptable(agent.ident):
+                other.remove_preference(agent.ident)
 
     def clean(self):
         """Clean this instance, removing from preference lists any incompatible
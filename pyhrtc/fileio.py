@@ -4,15 +4,11 @@ HRT etc.)
 
 
 import csv
-import re
-
-from openpyxl import load_workbook
+from itertools import chain
 
 from pyhrtc.basics import Agent, Couple, Instance
 from pyhrtc.weightedinstance import WeightedAgent, WeightedInstance
 
-JUST_NUMBER_RE = re.compile(r'^\d+$')
-
 
 class UnknownFormatException(Exception):
     """An unknown format for the instance file."""
@@ -22,6 +18,19 @@ class UnknownFormatException(Exception):
                          "cannot read this file format.")
 
 
+def _parse_lines(parser, lines):
+    """Runs one of the parsers below over an iterator of lines. The parsers
+    read with next(), so running out of lines raises StopIteration, which must
+    not escape: inside a generator or map() it would quietly end the iteration
+    instead of reporting the broken file.
+    """
+    try:
+        return parser(lines)
+    except StopIteration:
+        raise ValueError("Unexpected end of file while reading the "
+                         "instance") from None
+
+
 INSTANCE_READERS = {}
 """This dictionary should contain functions that, for a given variant of
 instance format, takes as input a filename and returns an Instance of that
@@ -29,35 +38,59 @@ problem.
 """
 
 
+def _parse_hrtc_glasgow_hrtc_nocolon(lines):
+    """Parses an instance of HRTC in the usual Glasgow format, but with no
+    colons, from an iterator over the lines of the instance.
+    """
+    num_single_residents = int(next(lines).rstrip())
+    num_couples = int(next(lines).rstrip())
+    num_hospitals = int(next(lines).rstrip())
+    instance = Instance()
+    for _ in range(num_single_residents):
+        tokens = next(lines).split()
+        doc = Agent(tokens[0])
+        doc.read_preferences(tokens[1:])
+        instance.add_agent_left(doc)
+    for _ in range(num_couples):
+        tokens = next(lines).split()
+        couple = Couple(tokens[0], tokens[1])
+        couple.read_preferences(tokens[2:])
+        instance.add_couple_left(couple)
+    for _ in range(num_hospitals):
+        tokens = next(lines).split()
+        hospital = Agent(tokens[0], capacity=int(tokens[1]))
+        hospital.read_preferences(tokens[2:])
+        instance.add_agent_right(hospital)
+    return instance
+
+
 def read_hrtc_glasgow_hrtc_nocolon(filename):
     """Reads in an instance of HRTC from filename in the usual Glasgow format,
     but with no colons.
     """
     with open(filename, "r") as infile:
-        num_single_residents = int(infile.readline().rstrip())
-        num_couples = int(infile.readline().rstrip())
-        num_hospitals = int(infile.readline().rstrip())
-        instance = Instance()
-        for _ in range(num_single_residents):
-            line = infile.readline()
-            ident = line.split()[0]
-            doc = Agent(ident)
-            doc.read_preferences(line.split()[1:])
-            instance.add_agent_left(doc)
-        for _ in range(num_couples):
-            line = infile.readline()
-            id1 = line.split()[0]
-            id2 = line.split()[1]
-            couple = Couple(id1, id2)
-            couple.read_preferences(line.split()[2:])
-            instance.add_couple_left(couple)
-        for _ in range(num_hospitals):
-            line = infile.readline()
-            ident = line.split()[0]
-            cap = int(line.split()[1])
-            hospital = Agent(ident, capacity=cap)
-            hospital.read_preferences(line.split()[2:])
-            instance.add_agent_right(hospital)
+        lines = infile.read().splitlines()
+    return _parse_lines(_parse_hrtc_glasgow_hrtc_nocolon, iter(lines))
+
+
+def _parse_hrt_glasgow_nocolon(lines):
+    """Parses an instance of HRT in the Glasgow format with an extra first
+    line, from an iterator over the lines of the instance.
+    """
+    next(lines)  # First line is just 0
+    num_doctor = int(next(lines).rstrip())
+    num_hospital = int(next(lines).rstrip())
+    instance = Instance()
+    for _ in range(num_doctor):
+        tokens = next(lines).split()
+        doctor = Agent(tokens[0])
+        doctor.read_preferences(tokens[1:])
+        instance.add_agent_left(doctor)
+    for _ in range(num_hospital):
+        tokens = next(lines).split()
+        hospital = Agent(tokens[0], capacity=int(tokens[1]))
+        hospital.read_preferences(tokens[2:])
+        instance.add_agent_right(hospital)
     return instance
 
 
@@ -67,22 +100,43 @@ def read_hrt_glasgow_nocolon(filename):
     is on the second line and the number of hospitals is on the third.
     """
     with open(filename, "r") as infile:
-        infile.readline()  # First line is just 0
-        num_doctor = int(infile.readline().rstrip())
-        num_hospital = int(infile.readline().rstrip())
-        instance = Instance()
-        for _ in range(num_doctor):
-            line = infile.readline()
-            ident = line.split()[0]
-            doctor = Agent(ident)
-            doctor.read_preferences(line.split()[1:])
-            instance.add_agent_left(doctor)
-        for _ in range(num_hospital):
-            line = infile.readline()
-            ident = line.split()[0]
-            hospital = Agent(ident, capacity=int(line.split()[1]))
-            hospital.read_preferences(line.split()[2:])
-            instance.add_agent_right(hospital)
+        lines = infile.read().splitlines()
+    return _parse_lines(_parse_hrt_glasgow_nocolon, iter(lines))
+
+
+def _parse_iain_instance(lines):
+    """Parses an instance of HRTC in Iain's format, from an iterator over the
+    lines of the instance.
+    """
+    total_num_residents = int(next(lines).rstrip())
+    num_hospitals = int(next(lines).rstrip())
+    num_couples = int(next(lines).rstrip())
+    num_single_residents = total_num_residents - 2*num_couples
+    next(lines)  # number jobs
+    next(lines)  # min pref list
+    next(lines)  # max pref list
+    next(lines)  # isEventDist
+    next(lines)  # res Popularity
+    next(lines)  # hos Popularity
+    next(lines)  # empty line
+    instance = Instance()
+    for _ in range(num_couples):
+        tokens = next(lines).split()
+        tokens_b = next(lines).split()
+        couple = Couple(tokens[0], tokens_b[0])
+        couple.read_individual_preferences(tokens[1:], tokens_b[1:])
+        instance.add_couple_left(couple)
+    for _ in range(num_single_residents):
+        tokens = next(lines).split()
+        doc = Agent(tokens[0])
+        doc.read_preferences(tokens[1:])
+        instance.add_agent_left(doc)
+    next(lines)  # Empty line
+    for _ in range(num_hospitals):
+        tokens = next(lines).split()
+        hospital = Agent(tokens[0], capacity=int(tokens[1]))
+        hospital.read_preferences(tokens[2:])
+        instance.add_agent_right(hospital)
     return instance
 
 
@@ -90,41 +144,37 @@ def read_iain_instance(filename):
     """Reads in an instance of HRTC from filename in Iain's format.
     """
     with open(filename, "r") as infile:
-        total_num_residents = int(infile.readline().rstrip())
-        num_hospitals = int(infile.readline().rstrip())
-        num_couples = int(infile.readline().rstrip())
-        num_single_residents = total_num_residents - 2*num_couples
-        infile.readline()  # number jobs
-        infile.readline()  # min pref list
-        infile.readline()  # max pref list
-        infile.readline()  # isEventDist
-        infile.readline()  # res Popularity
-        infile.readline()  # hos Popularity
-        infile.readline()  # empty line
-        instance = Instance()
-        for _ in range(num_couples):
-            line = infile.readline().rstrip()
-            line_b = infile.readline().rstrip()
-            ident = line.split()[0]
-            ident2 = line_b.split()[0]
-            couple = Couple(ident, ident2)
-            couple.read_individual_preferences(line.split()[1:],
-                                               line_b.split()[1:])
-            instance.add_couple_left(couple)
-        for _ in range(num_single_residents):
-            line = infile.readline()
-            ident = line.split()[0]
-            doc = Agent(ident)
-            doc.read_preferences(line.split()[1:])
-            instance.add_agent_left(doc)
-        infile.readline()  # Empty line
-        for _ in range(num_hospitals):
-            line = infile.readline().rstrip()
-            ident = line.split()[0]
-            hospital = Agent(ident, capacity=int(line.split()[1]))
-            hospital.read_preferences(line.split()[2:])
-            instance.add_agent_right(hospital)
-    return instance
+        lines = infile.read().splitlines()
+    return _parse_lines(_parse_iain_instance, iter(lines))
+
+
+def _parse_smti_grp_table_no_header(lines):
+    """Parses an SMTI-GRP instance without headers, from an iterator over the
+    lines of the instance.
+    :param lines: The lines of the instance
+    :type lines: Iterator[string]
+    :return: the instance
+    :rtype: WeightedInstance
+    """
+    lefts = {}
+    rights = {}
+    int(next(lines))
+    columns = int(next(lines))
+    left_ids = [str(left_id) for left_id in range(1, columns+1)]
+    left_agents = []
+    for left_id in left_ids:
+        lefts[left_id] = WeightedAgent(left_id)
+        left_agents.append(lefts[left_id])
+    for right_id, line in enumerate(lines, start=1):
+        right_id = str(right_id)
+        right = WeightedAgent(right_id)
+        for left_id, left, weight in zip(left_ids, left_agents,
+                                         line.split()):
+            weight = float(weight)
+            right.add_weight(left_id, weight)
+            left.add_weight(right_id, weight)
+        rights[right_id] = right
+    return WeightedInstance(lefts, rights)
 
 
 def read_smti_grp_table_no_header(filename):
@@ -136,25 +186,37 @@ def read_smti_grp_table_no_header(filename):
     :return: the instance
     :rtype: WeightedInstance
     """
+    with open(filename, "r") as infile:
+        lines = infile.read().splitlines()
+    return _parse_lines(_parse_smti_grp_table_no_header, iter(lines))
+
+
+def _parse_smti_grp_table(lines):
+    """Parses an SMTI-GRP instance with row and column identifiers, from an
+    iterator over the lines of the instance.
+    :param lines: The lines of the instance
+    :type lines: Iterator[string]
+    :return: the instance
+    :rtype: WeightedInstance
+    """
     lefts = {}
     rights = {}
-    with open(filename, "r") as infile:
-        int(infile.readline())
-        columns = int(infile.readline())
-        for left_id in range(1, columns+1):
-            left_id = str(left_id)
-            lefts[left_id] = WeightedAgent(left_id)
-        right_id = 0
-        for line in infile:
-            right_id += 1
-            right = WeightedAgent(str(right_id))
-            left_id = 0
-            for weight in line.split():
-                left_id += 1
-                weight = float(weight)
-                right.add_weight(str(left_id), weight)
-                lefts[str(left_id)].add_weight(right.ident, weight)
-            rights[str(right_id)] = right
+    reader = csv.reader(lines)
+    left_ids = next(reader)[1:]
+    left_agents = []
+    for left_id in left_ids:
+        lefts[left_id] = WeightedAgent(left_id)
+        left_agents.append(lefts[left_id])
+    for row in reader:
+        if not row:
+            continue
+        right_id = row[0]
+        right = WeightedAgent(right_id)
+        for left_id, left, weight in zip(left_ids, left_agents, row[1:]):
+            weight = float(weight)
+            right.add_weight(left_id, weight)
+            left.add_weight(right_id, weight)
+        rights[right_id] = right
     return WeightedInstance(lefts, rights)
 
 
@@ -166,24 +228,9 @@ def read_smti_grp_table(filename):
     :return: the instance
     :rtype: WeightedInstance
     """
-    lefts = {}
-    rights = {}
     with open(filename, "r") as infile:
-        reader = csv.DictReader(infile)
-        topleft_header = reader.fieldnames[0]
-        for left_id in reader.fieldnames[1:]:
-            lefts[left_id] = WeightedAgent(left_id)
-        for row in reader:
-            right_id = row[topleft_header]
-            right = WeightedAgent(right_id)
-            for left_id, weight in row.items():
-                if left_id == topleft_header:
-                    continue
-                weight = float(weight)
-                right.add_weight(left_id, weight)
-                lefts[left_id].add_weight(right.ident, weight)
-            rights[right_id] = right
-    return WeightedInstance(lefts, rights)
+        lines = infile.read().splitlines()
+    return _parse_lines(_parse_smti_grp_table, iter(lines))
 
 
 def read_smti_grp_table_xls(filename):
@@ -194,10 +241,12 @@ def read_smti_grp_table_xls(filename):
     :return: the instance
     :rtype: WeightedInstance
     """
+    # openpyxl is slow to import, and only needed for this one format
+    from openpyxl import load_workbook
     lefts = {}
     rights = {}
-    left_ids = {}
-    left_ind = 1
+    left_ids = []
+    left_agents = []
     workbook = load_workbook(filename, read_only=True)
     first = True
     for row in workbook.active:
@@ -205,19 +254,16 @@ def read_smti_grp_table_xls(filename):
             for left_id in row[1:]:
                 left_id = left_id.value
                 lefts[left_id] = WeightedAgent(left_id)
-                left_ids[left_ind] = left_id
-                left_ind += 1
+                left_ids.append(left_id)
+                left_agents.append(lefts[left_id])
             first = False
         else:
             right_id = row[0].value
             right = WeightedAgent(right_id)
-            for left_id, cell in enumerate(row):
-                if left_id not in left_ids:
-                    continue
-                left_id = left_ids[left_id]
+            for left_id, left, cell in zip(left_ids, left_agents, row[1:]):
                 weight = float(cell.value)
                 right.add_weight(left_id, weight)
-                lefts[left_id].add_weight(right.ident, weight)
+                left.add_weight(right_id, weight)
             rights[right_id] = right
     return WeightedInstance(lefts, rights)
 
@@ -230,6 +276,20 @@ INSTANCE_READERS["SMTI-GRP Table"] = read_smti_grp_table
 INSTANCE_READERS["SMTI-GRP Table XLS"] = read_smti_grp_table_xls
 INSTANCE_READERS["SMTI-GRP Table no header"] = read_smti_grp_table_no_header
 
+_INSTANCE_PARSERS = {
+    read_hrtc_glasgow_hrtc_nocolon: _parse_hrtc_glasgow_hrtc_nocolon,
+    read_iain_instance: _parse_iain_instance,
+    read_hrt_glasgow_nocolon: _parse_hrt_glasgow_nocolon,
+    read_smti_grp_table: _parse_smti_grp_table,
+    read_smti_grp_table_no_header: _parse_smti_grp_table_no_header,
+}
+"""Maps each of the builtin readers above to the function that does the
+actual parsing, given an iterator over the lines of an instance. read_hrtc
+uses these to avoid opening a file twice when it has to detect the variant.
+Readers registered in INSTANCE_READERS by other code are still called with
+the filename.
+"""
+
 
 def write_hrtc_glasgow_hrtc_nocolon(instance, filename):
     """Writes an Instance to a file in the Glasgow HRTC, without colons.
@@ -251,34 +311,34 @@ def write_hrtc_glasgow_hrtc(instance, filename, colon):
         colon = ":"
     else:
         colon = ""
+    lines = [f"{instance.number_of_single_agents_left()}\n",
+             f"{instance.number_of_couples_left()}\n",
+             f"{instance.number_of_single_agents_right()}\n"]
+    lines.extend(f"{agent.ident}{colon} {agent.preference_string()}\n"
+                 for agent in instance.single_agents_left)
+    lines.extend(f"{couple.split_ident()}{colon} "
+                 f"{couple.preference_string()}\n"
+                 for couple in instance.couples_left)
+    lines.extend(f"{agent.ident}{colon} {agent.capacity}{colon} "
+                 f"{agent.preference_string()}\n"
+                 for agent in instance.single_agents_right)
     with open(filename, "w") as outfile:
-        outfile.write("%d\n" % instance.number_of_single_agents_left())
-        outfile.write("%d\n" % instance.number_of_couples_left())
-        outfile.write("%d\n" % instance.number_of_single_agents_right())
-        for agent in instance.single_agents_left:
-            outfile.write("%s%s %s\n" % (agent.ident, colon,
-                                         agent.preference_string()))
-        for couple in instance.couples_left:
-            outfile.write("%s%s %s\n" % (couple.split_ident(), colon,
-                                         couple.preference_string()))
-        for agent in instance.single_agents_right:
-            outfile.write("%s%s %d%s %s\n" % (agent.ident, colon,
-                                              agent.capacity, colon,
-                                              agent.preference_string()))
+        outfile.write("".join(lines))
 
 
 def write_hrtc_edin_hrtc(instance, filename):
     """Writes an Instance to a file in the Edinburgh? HRTC format
     """
+    lines = ["0\n",
+             f"{instance.number_of_single_agents_left()}\n",
+             f"{instance.number_of_single_agents_right()}\n"]
+    lines.extend(f"{agent.ident} {agent.preference_string()}\n"
+                 for agent in instance.single_agents_left)
+    lines.extend(f"{agent.ident} {agent.capacity} "
+                 f"{agent.preference_string()}\n"
+                 for agent in instance.single_agents_right)
     with open(filename, "w") as outfile:
-        outfile.write("0\n")
-        outfile.write("%d\n" % instance.number_of_single_agents_left())
-        outfile.write("%d\n" % instance.number_of_single_agents_right())
-        for agent in instance.single_agents_left:
-            outfile.write("%s %s\n" % (agent.ident, agent.preference_string()))
-        for agent in instance.single_agents_right:
-            outfile.write("%s %d %s\n" % (agent.ident, agent.capacity,
-                                          agent.preference_string()))
+        outfile.write("".join(lines))
 
 
 Instance.add_writer("Glasgow_HRTC_nocolon", write_hrtc_glasgow_hrtc_nocolon)
@@ -286,6 +346,57 @@ Instance.add_writer("Glasgow_HRTC_colon", write_hrtc_glasgow_hrtc_colon)
 Instance.add_writer("Edin_HRTC", write_hrtc_edin_hrtc)
 
 
+def _sniff_filetype(infile):
+    """Given a file containing an instance of HRTC, opened for reading, tries
+    to determine the variant by reading as few lines as possible.
+
+    :param infile: The file to read from
+    :return: the variant as a string, and a list of the lines that were read
+    """
+    head = []
+
+    def next_line():
+        """Read the next line, remembering it for later."""
+        line = infile.readline()
+        # An empty string means the end of the file, not an empty line
+        if line:
+            head.append(line)
+        return line.rstrip()
+
+    firstline = next_line()
+    variant = 0
+    try:
+        if "," in firstline:
+            variant = "SMTI-GRP Table"
+        elif int(firstline) == 0:
+            variant = "Glasgow_HRT_extraline"
+        else:
+            try:
+                second_line = int(next_line())
+            except ValueError:
+                second_line = None
+            third_line = next_line()
+            if ":" in third_line:
+                variant = "Glasgow_HRT_colon"
+            elif third_line.isdigit():
+                fourth_line = next_line()
+                if ":" in fourth_line:
+                    variant = "Glasgow_HRTC_colon"
+                else:
+                    next_line()  # 5th line
+                    next_line()  # 6th line
+                    seventh_line = next_line()
+                    if "false" in seventh_line or "true" in seventh_line:
+                        variant = "Iain"
+                    else:
+                        variant = "Glasgow_HRTC_nocolon"
+            elif second_line and third_line.count(" ") == second_line - 1:
+                variant = "SMTI-GRP Table no header"
+    except ValueError:
+        variant = firstline
+    return variant, head
+
+
 def read_hrtc_filetype(filename):
     """Given the name of a file containing an instance of HRTC, tries to
     determine the variant.
@@ -296,48 +407,27 @@ def read_hrtc_filetype(filename):
     if ".xls" in filename:
         return "SMTI-GRP Table XLS"
     with open(filename, "r") as infile:
-        firstline = infile.readline().rstrip()
-        variant = 0
-        try:
-            if "," in firstline:
-                variant = "SMTI-GRP Table"
-            elif int(firstline) == 0:
-                variant = "Glasgow_HRT_extraline"
-            else:
-                try:
-                    second_line = int(infile.readline().rstrip())
-                except ValueError:
-                    second_line = None
-                third_line = infile.readline().rstrip()
-                if ":" in third_line:
-                    variant = "Glasgow_HRT_colon"
-                elif JUST_NUMBER_RE.match(third_line):
-                    fourth_line = infile.readline().rstrip()
-                    if ":" in fourth_line:
-                        variant = "Glasgow_HRTC_colon"
-                    else:
-                        infile.readline()  # 5th line
-                        infile.readline()  # 6th line
-                        seventh_line = infile.readline().rstrip()
-                        if "false" in seventh_line or "true" in seventh_line:
-                            variant = "Iain"
-                        else:
-                            variant = "Glasgow_HRTC_nocolon"
-                elif second_line and third_line.count(" ") == second_line - 1:
-                    variant = "SMTI-GRP Table no header"
-        except ValueError:
-            variant = firstline
+        variant, _ = _sniff_filetype(infile)
     return variant
 
 
 def read_hrtc(filename, variant=None):
     """Reads an instance of HRTC from the given file and returns the resulting
-    Instance object.
+    Instance object. If the variant has to be autodetected, the file is only
+    read once: the lines read while detecting the variant are handed on to the
+    parser along with the rest of the file.
 
     :param filename: The name of the file to read
     :param variant: The type of the file. If not present, will be autodetected.
     :return: An instance of HRTC
     """
+    if variant is None and ".xls" not in filename:
+        with open(filename, "r") as infile:
+            variant, head = _sniff_filetype(infile)
+            parser = _INSTANCE_PARSERS.get(INSTANCE_READERS.get(variant))
+            if parser is not None:
+                return _parse_lines(parser,
+                                    chain(head, infile.read().splitlines()))
     if variant is None:
         variant = read_hrtc_filetype(filename)
     if variant in INSTANCE_READERS:
@@ -2,6 +2,7 @@
 
 
 import random
+from itertools import chain
 
 from pyhrtc.basics import Agent, Couple, Instance
 
@@ -42,8 +43,9 @@ def gen_capacities(total, hospitals, even_posts):
             capacities[hosp] += 1
     else:
         capacities = [1] * hospitals
-        for _ in range(total-hospitals):
-            capacities[random.randrange(hospitals)] += 1
+        # Draw the hospital for every extra post in one go
+        for hosp in random.choices(range(hospitals), k=total-hospitals):
+            capacities[hosp] += 1
     return capacities
 
 
@@ -78,37 +80,47 @@ def random_hrtc(number_of_hospitals, number_of_single_residents,
         capacity = number_of_single_residents + 2 * number_of_couples
     capacities = gen_capacities(capacity, number_of_hospitals, even_posts)
     # Generate all the hospitals and agents
-    hospitals = {ident + start_at_one: Agent(ident + start_at_one,
-                                                capacities[ident]) for ident in
-                 range(number_of_hospitals)}
-    single_residents = {ident + start_at_one: Agent(ident + start_at_one)
-                        for ident in range(number_of_single_residents)}
-    couple_doctors = {}
-    for ident in range(number_of_couples):
-        offset = number_of_single_residents + 2 * ident + start_at_one
-        couple_doctors[2*ident+start_at_one] = Agent(offset)
-        couple_doctors[2*ident+1+start_at_one] = Agent(offset+1)
-    # Generate a master list
+    first = int(start_at_one)
+    hospitals = {ident: Agent(ident, cap)
+                 for ident, cap in enumerate(capacities, start=first)}
+    single_residents = {ident: Agent(ident) for ident in
+                        range(first, first + number_of_single_residents)}
+    # Couple doctors are keyed from first, but their IDs follow on from the
+    # single residents
+    couple_doctors = {key: Agent(number_of_single_residents + key) for key in
+                      range(first, first + 2 * number_of_couples)}
+    # Generate a master list, once, to be shared by all hospitals
+    ordering = None
     if master_list:
-        master_list = [doctor.ident for doctor in single_residents.values()]
-        master_list.extend(doctor.ident for doctor in couple_doctors.values())
-        master_list = make_master_list(master_list)
+        ordering = make_master_list(
+            [doctor.ident for doctor in chain(single_residents.values(),
+                                              couple_doctors.values())])
     if not hospital_pref_length:
-        for doctor in single_residents.values():
-            doctor.make_random_preferences(hospitals.keys(),
-                                           length=resident_pref_length,
-                                           tie_density=resident_tie_density)
-        for doctor in couple_doctors.values():
-            doctor.make_random_preferences(hospitals.keys(),
+        if resident_pref_length:
+            # For each hospital, the doctors that find it acceptable, filled
+            # in as we generate the preferences of the doctors.
+            options_by_hospital = {ident: [] for ident in hospitals}
+        else:
+            # Every doctor finds every hospital acceptable, so the hospitals
+            # can all share one list of options.
+            all_doctors = [doctor.ident for doctor in
+                           chain(single_residents.values(),
+                                 couple_doctors.values())]
+            options_by_hospital = dict.fromkeys(hospitals, all_doctors)
+        # random.sample() needs a sequence, so only build this once
+        hospital_ids = list(hospitals)
+        for doctor in chain(single_residents.values(),
+                            couple_doctors.values()):
+            doctor.make_random_preferences(hospital_ids,
                                            length=resident_pref_length,
                                            tie_density=resident_tie_density)
+            if resident_pref_length:
+                for hospital_id in doctor.acceptable_agents():
+                    options_by_hospital[hospital_id].append(doctor.ident)
         for hospital in hospitals.values():
-            options = [doctor.ident for doctor in single_residents.values()
-                       if doctor.is_acceptable(hospital.ident)]
-            options.extend([doctor.ident for doctor in couple_doctors.values()
-                            if doctor.is_acceptable(hospital.ident)])
-            if master_list:
-                hospital.make_master_list_preferences(options, master_list)
+            options = options_by_hospital[hospital.ident]
+            if ordering is not None:
+                hospital.make_master_list_preferences(options, ordering)
             else:
                 hospital.make_random_preferences(options,
                                                  tie_density=hospital_tie_density)
@@ -118,8 +130,8 @@ def random_hrtc(number_of_hospitals, number_of_single_residents,
     couples = {}
     for ident in range(number_of_couples):
         offset = 2 * ident + start_at_one
-        couple = Couple.from_two_doctors(couple_doctors[offset],
-                                         couple_doctors[offset + 1])
+        couple = Couple.from_two_agents(couple_doctors[offset],
+                                        couple_doctors[offset + 1])
         couples[couple.ident] = couple
     instance = Instance(single_agents_left=single_residents, couples_left=couples,
                         single_agents_right=hospitals)
@@ -1,17 +1,50 @@
 """Various IP models for HRTC and variants."""
 
+from functools import partial
+
 from pulp import LpProblem, LpMaximize, LpVariable, lpSum, LpStatusOptimal
 
 from pyhrtc.weightedinstance import WeightedInstance
 
+# Every variable in these models is binary
+_binary_variable = partial(LpVariable, cat='Binary')
+
+
+class UnsupportedInstanceException(Exception):
+    """The instance cannot be used with this model, or with this setting of
+    the model. Raised by MAX_SMTI_IP() if the instance has couples, and by
+    setting MAX_SMTI_IP.weighted if the instance is not weighted.
+    """
+
+
+class ModelBuiltException(Exception):
+    """An attempt to change a model after it has been built. Raised by
+    setting MAX_SMTI_IP.dummy_variables or MAX_SMTI_IP.weighted after
+    build_model() or solve().
+    """
+
+    def __init__(self):
+        super().__init__("Cannot modify model after it is built")
+
+
+class NotOptimalException(Exception):
+    """The solver did not find an optimal solution. Raised by
+    MAX_SMTI_IP.solve().
+    """
+
+    def __init__(self):
+        super().__init__("Not optimal solution.")
+
 
 class MAX_SMTI_IP(LpProblem):
     """An IP model to find a maximum cardinality stable matching.
+    :raises UnsupportedInstanceException: if the instance has couples
     """
 
     def __init__(self, instance, name=None):
         if instance.number_of_couples_left() != 0:
-            raise Exception("This model does not support couples")
+            raise UnsupportedInstanceException("This model does not support "
+                                               "couples")
         if name is None:
             name = "SMTI"
         super().__init__(name, LpMaximize)
@@ -46,9 +79,10 @@ class MAX_SMTI_IP(LpProblem):
     def dummy_variables(self, choice):
         """Enable (or disable) the use of dummy variables. Note that this only
         makes sense before building or solving.
+        :raises ModelBuiltException: if the model has already been built
         """
         if self._built:
-            raise Exception("Cannot modify model after it is built")
+            raise ModelBuiltException()
         self._use_dummy = choice
 
     @property
@@ -59,12 +93,16 @@ class MAX_SMTI_IP(LpProblem):
     @weighted.setter
     def weighted(self, choice):
         """Enable (or disable) the search for a maximum weight stable matching.
+        :raises ModelBuiltException: if the model has already been built
+        :raises UnsupportedInstanceException: if enabled for an instance that
+            is not a WeightedInstance
         """
         if self._built:
-            raise Exception("Cannot modify model after it is built")
+            raise ModelBuiltException()
         if choice and not isinstance(self._instance, WeightedInstance):
-            raise Exception("Cannot find a maximum weight stable matching if "
-                            "the instance is not weighted")
+            raise UnsupportedInstanceException("Cannot find a maximum weight "
+                                               "stable matching if the "
+                                               "instance is not weighted")
         self._weighted = choice
 
     @property
@@ -84,17 +122,15 @@ class MAX_SMTI_IP(LpProblem):
         """
         if self._variables_lr is not None:
             return
-        self._variables_lr = {}
-        self._variables_rl = {}
+        self._variables_lr = variables_lr = {}
+        self._variables_rl = variables_rl = {}
         for left in self._instance.single_agents_left:
-            self._variables_lr[left.ident] = {}
+            left_id = left.ident
+            variables_lr[left_id] = left_variables = {}
             for right in left.acceptable_agents():
-                name = f"x_{left.ident}_{right}"
-                variable = LpVariable(name, cat='Binary')
-                self._variables_lr[left.ident][right] = variable
-                if right not in self._variables_rl:
-                    self._variables_rl[right] = {}
-                self._variables_rl[right][left.ident] = variable
+                variable = _binary_variable(f"x_{left_id}_{right}")
+                left_variables[right] = variable
+                variables_rl.setdefault(right, {})[left_id] = variable
 
     def _make_capacity_constraints(self):
         """Makes the constraints for capacities.
@@ -117,94 +153,90 @@ class MAX_SMTI_IP(LpProblem):
         """
         if self._variables_yl is not None:
             return
-        self._variables_yl = {}
-        self._variables_yr = {}
+        self._variables_yl = variables_yl = {}
+        self._variables_yr = variables_yr = {}
+        variables_lr = self._variables_lr
         for left in self._instance.single_agents_left:
-            self._variables_yl[left.ident] = {}
-            name = f"y_l_{left.ident}_1"
-            self._variables_yl[left.ident][1] = LpVariable(name, cat='Binary')
-            sum_left = []
-            for right_id in left.preferences[0]:
-                sum_left.append(self._variables_lr[left.ident][right_id])
-            self += (lpSum(sum_left) == self._variables_yl[left.ident][1])
+            x_left = variables_lr[left.ident]
+            variables_yl[left.ident] = y_left = {}
+            y_left[1] = _binary_variable(f"y_l_{left.ident}_1")
+            self += (lpSum(x_left[right_id]
+                           for right_id in left.preferences[0])
+                     == y_left[1])
             for k, tie_group in enumerate(left.preferences[1:], start=2):
-                name = f"y_l_{left.ident}_{k}"
-                self._variables_yl[left.ident][k] = LpVariable(name,
-                                                               cat='Binary')
-                sum_left = []
-                for right_id in tie_group:
-                    sum_left.append(self._variables_lr[left.ident][right_id])
-                self += (lpSum(sum_left) + self._variables_yl[left.ident][k-1]
-                         == self._variables_yl[left.ident][k])
+                y_left[k] = _binary_variable(f"y_l_{left.ident}_{k}")
+                self += (lpSum(x_left[right_id] for right_id in tie_group)
+                         + y_left[k-1] == y_left[k])
         for right in self._instance.single_agents_right:
-            self._variables_yr[right.ident] = {}
-            name = f"y_r_{right.ident}_1"
-            self._variables_yr[right.ident][1] = LpVariable(name, cat='Binary')
-            sum_right = []
-            for left_id in right.preferences[0]:
-                sum_right.append(self._variables_lr[left_id][right.ident])
-            self += (lpSum(sum_right) == self._variables_yr[right.ident][1])
+            right_id = right.ident
+            variables_yr[right_id] = y_right = {}
+            y_right[1] = _binary_variable(f"y_r_{right_id}_1")
+            self += (lpSum(variables_lr[left_id][right_id]
+                           for left_id in right.preferences[0])
+                     == y_right[1])
             for k, tie_group in enumerate(right.preferences[1:], start=2):
-                name = f"y_r_{right.ident}_{k}"
-                self._variables_yr[right.ident][k] = LpVariable(name,
-                                                                cat='Binary')
-                sum_right = []
-                for left_id in tie_group:
-                    sum_right.append(self._variables_lr[left_id][right.ident])
-                self += (lpSum(sum_right)
-                         + self._variables_yr[right.ident][k-1]
-                         == self._variables_yr[right.ident][k])
+                y_right[k] = _binary_variable(f"y_r_{right_id}_{k}")
+                self += (lpSum(variables_lr[left_id][right_id]
+                               for left_id in tie_group)
+                         + y_right[k-1] == y_right[k])
+        # ranks[right][left] is the rank of left according to right, found
+        # with one pass over each preference list.
+        ranks = {right.ident: {left_id: k
+                               for k, tie_group in enumerate(right.preferences,
+                                                             start=1)
+                               for left_id in tie_group}
+                 for right in self._instance.single_agents_right}
         for left in self._instance.single_agents_left:
+            y_left = variables_yl[left.ident]
             for k, tie_group in enumerate(left.preferences[1:], start=2):
                 for right_id in tie_group:
-                    right = self._instance.single_agent_right(right_id)
-                    rank = right.rank_of(left.ident)
-                    self += (1 - self._variables_yl[left.ident][k]
-                             <= self._variables_yr[right_id][rank])
+                    rank = ranks[right_id][left.ident]
+                    self += 1 - y_left[k] <= variables_yr[right_id][rank]
 
     def _make_stability_constraints(self):
         """Makes the stability constraints.
         """
+        variables_lr = self._variables_lr
+        variables_rl = self._variables_rl
+        single_agent_right = self._instance.single_agent_right
         for left in self._instance.single_agents_left:
+            left_id = left.ident
+            x_left = variables_lr[left_id]
             for right_id in left.acceptable_agents():
-                right = self._instance.single_agent_right(right_id)
-                xiq = lpSum(self._variables_lr[left.ident][other]
-                            for other in left.as_good_as(right.ident))
-                xpj = lpSum(self._variables_rl[right.ident][other]
-                            for other in right.as_good_as(left.ident))
-                self += 1 - xiq <= xpj, f"{left.ident}.{right.ident}.stability"
+                right = single_agent_right(right_id)
+                x_right = variables_rl[right_id]
+                xiq = lpSum(x_left[other]
+                            for other in left.as_good_as(right_id))
+                xpj = lpSum(x_right[other]
+                            for other in right.as_good_as(left_id))
+                self += 1 - xiq <= xpj, f"{left_id}.{right_id}.stability"
 
     def _add_dummy_card_constraint(self):
         """Make a cardinality constraint obased on the dummy variables.
         """
-        constraint = []
-        for left in self._instance.single_agents_left:
-            max_group = len(left.preferences)
-            constraint.append(self._variables_yl[left.ident][max_group])
-        self += (lpSum(constraint) == self._cardinality_restriction,
+        constraint = lpSum(
+            self._variables_yl[left.ident][len(left.preferences)]
+            for left in self._instance.single_agents_left)
+        self += (constraint == self._cardinality_restriction,
                  f"card-constraint")
 
     def _make_dummy_card_objective(self):
         """Make an objective based on the xij variables.
         """
-        objective = []
-        for left in self._instance.single_agents_left:
-            max_group = len(left.preferences)
-            objective.append(self._variables_yl[left.ident][max_group])
-        self += lpSum(objective)
+        self += lpSum(self._variables_yl[left.ident][len(left.preferences)]
+                      for left in self._instance.single_agents_left)
 
     def _make_card_objective(self):
         """Make an objective based on the xij variables.
         """
         objective = []
         for left in self._instance.single_agents_left:
+            variables = self._variables_lr[left.ident]
             for right in left.acceptable_agents():
                 if self.weighted:
-                    objective.append(left.weight_of(right) *
-                                     self._variables_lr[left.ident][right])
+                    objective.append(left.weight_of(right) * variables[right])
                 else:
-                    objective.append(self._variables_lr[left.ident][right])
-                objective.append(self._variables_lr[left.ident][right])
+                    objective.append(variables[right])
         self += lpSum(objective)
 
     def build_model(self):
@@ -227,20 +259,21 @@ class MAX_SMTI_IP(LpProblem):
             self._make_card_objective()
         self._built = True
 
-    def solve(self):
+    def solve(self, solver=None):
         """Solves the problem, and returns the matching. The matching is a map
         such that matching[left] = right if and only if left is matched to
-        right.
+        right. If given, solver is the PuLP solver to use, otherwise PuLP's
+        default solver is used.
+        :raises NotOptimalException: if the solver does not find an optimal
+            solution
         """
         self.build_model()
-        super().solve()
+        super().solve(solver)
         if self.status != LpStatusOptimal:
-            raise Exception("Not optimal solution.")
-        matching = {}
-        for left in self._instance.single_agents_left:
-            for right in left.acceptable_agents():
-                # Because some solvers sometimes return "close to 1" instead of
-                # 1, even for binary values, we just get close.
-                if self._variables_lr[left.ident][right].varValue >= 0.95:
-                    matching[left.ident] = right
-        return matching
+            raise NotOptimalException()
+        # Because some solvers sometimes return "close to 1" instead of 1,
+        # even for binary values, we just get close.
+        return {left: right
+                for left, variables in self._variables_lr.items()
+                for right, variable in variables.items()
+                if variable.varValue >= 0.95}
@@ -3,68 +3,63 @@
 
 
 def create_sat_smti(instance):
-    """Creates a CNF SAT encoding of an SMTI instance.
+    """Creates a CNF SAT encoding of an SMTI instance. Each satisfying
+    assignment corresponds to a matching in the instance.
+    :return: The encoding, in DIMACS CNF format
+    :rtype: string
     :raises NotImplementedError: Raised if the instance is not an SMTI instance
     """
     if not instance.is_SMTI():
         raise NotImplementedError
 
+    residents = instance.single_agents_left
+    hospitals = instance.single_agents_right
     varmap = {}
     var_count = 1
-    for agent in instance.single_residents:
-        pref_length = 1
-        for pref_group in agent.preferences:
-            for pref in pref_group:
-                varmap[("r", agent.id, pref_length)] = var_count
-                var_count += 1
-                pref_length += 1
-        varmap[("r", agent.id, pref_length)] = var_count
-        var_count += 1
-    for agent in instance.single_residents:
-        pref_length = 1
-        for pref_group in agent.preferences:
-            for pref in pref_group:
-                varmap[("h", agent.id, pref_length)] = var_count
-                var_count += 1
-                pref_length += 1
-        varmap[("h", agent.id, pref_length)] = var_count
-        var_count += 1
+    # Each agent gets a consecutive block of num_preferences + 1 variables
+    for side, agents in (("r", residents), ("h", hospitals)):
+        for agent in agents:
+            length = agent.num_preferences + 1
+            varmap.update(((side, agent.ident, pref_length),
+                           var_count + pref_length - 1)
+                          for pref_length in range(1, length + 1))
+            var_count += length
 
-    encoding = ""
+    clauses = []
     # Clause 1
-    for resident in instance.single_residents:
-        encoding += "%d 0" % varmap[("r", resident.id, 1)]
+    for resident in residents:
+        clauses.append(f"{varmap[('r', resident.ident, 1)]} 0")
     # Clause 2
-    for hospital in instance.hospitals:
-        encoding += "%d 0" % varmap[("h", hospital.id, 1)]
+    for hospital in hospitals:
+        clauses.append(f"{varmap[('h', hospital.ident, 1)]} 0")
     # Clause 3
-    for resident in instance.single_residents:
-        for pref in range(resident.num_preferences):
-            encoding += "%d -%d 0" % (varmap[("r", resident.id, pref)],
-                                      varmap[("r", resident.id, pref)]+1)
+    for resident in residents:
+        for pref in range(1, resident.num_preferences + 1):
+            var = varmap[("r", resident.ident, pref)]
+            clauses.append(f"{var} -{var + 1} 0")
     # Clause 4
-    for hospital in instance.single_hospitals:
-        for pref in range(hospital.num_preferences):
-            encoding += "%d -%d 0" % (varmap[("h", hospital.id, pref)],
-                                      varmap[("h", hospital.id, pref)]+1)
-    for hospital in instance.hospitals:
-        for resident in instance.single_residents:
-            # Clause 5
-            # Note that position_of and rank_of are two different things.
-            p = resident.position_of(hospital)
-            q = hospital.position_of(resident)
-            encoding += "-%d %d %d 0" % (varmap[("r", resident.id, p)],
-                                         varmap[("r", resident.id, p)]+1,
-                                         varmap[("h", hospital.id, q)])
-            encoding += "-%d %d -%d 0" % (varmap[("r", resident.id, p)],
-                                          varmap[("r", resident.id, p)]+1,
-                                          varmap[("h", hospital.id, q)]+1)
-            # Clause 6
-            encoding += "-%d %d %d 0" % (varmap[("h", hospital.id, q)],
-                                         varmap[("h", hospital.id, q)]+1,
-                                         varmap[("r", resident.id, p)])
-            encoding += "-%d %d -%d 0" % (varmap[("h", hospital.id, q)],
-                                          varmap[("h", hospital.id, q)]+1,
-                                          varmap[("r", resident.id, p)]+1)
-
-
+    for hospital in hospitals:
+        for pref in range(1, hospital.num_preferences + 1):
+            var = varmap[("h", hospital.ident, pref)]
+            clauses.append(f"{var} -{var + 1} 0")
+    # Clauses 5 (for residents) and 6 (for hospitals): an agent assigned to
+    # its p-th preference must be the q-th preference that agent is assigned
+    for side, agents, other_side, other_agent in (
+            ("r", residents, "h", instance.single_agent_right),
+            ("h", hospitals, "r", instance.single_agent_left)):
+        for agent in agents:
+            for p, other_id in enumerate(agent.acceptable_agents(), start=1):
+                # Note that position_of and rank_of are two different things.
+                q = other_agent(other_id).position_of(agent.ident) + 1
+                var = varmap[(side, agent.ident, p)]
+                if q == 0:
+                    # Not acceptable the other way around, so they can never
+                    # be assigned to each other
+                    clauses.append(f"-{var} {var + 1} 0")
+                    continue
+                other_var = varmap[(other_side, other_id, q)]
+                clauses.append(f"-{var} {var + 1} {other_var} 0")
+                clauses.append(f"-{var} {var + 1} -{other_var + 1} 0")
+    # One clause per line, as in DIMACS CNF
+    header = f"p cnf {var_count - 1} {len(clauses)}"
+    return "\n".join([header] + clauses) + "\n"
@@ -1,6 +1,9 @@
 """Describes an instance of our problem.
 """
 
+from itertools import groupby
+from operator import itemgetter
+
 from pyhrtc.basics import Agent, Instance
 
 
@@ -8,9 +11,12 @@ class WeightedAgent(Agent):
     """An agent in an instance of SMTI-GRP.
     """
 
+    __slots__ = ('_weights', '_sorted_preferences')
+
     def __init__(self, ident, capacity=1):
         super().__init__(ident, capacity=capacity)
-        self._preference_weights = []
+        # Maps the ID of each acceptable agent to its weight, in the order the
+        # weights were added
         self._weights = {}
         self._sorted_preferences = None
 
@@ -21,21 +27,27 @@ class WeightedAgent(Agent):
         :param weight: The weight of other_ident according to this agent
         :type weight: float
         """
-        self._preference_weights.append((other_ident, weight))
         self._weights[other_ident] = weight
+        # The sorted order is rebuilt lazily, the next time it is needed
+        self._sorted_preferences = None
+        self._preferences_changed()
 
     @property
     def preferences(self):
         """Return the preferences, as a list of tie groups. Entries which are
         not in a tie at all still appear by themselvs in a list (i.e. 1 (2 3)
         is [[1], [2, 3]]).
+
+        As for an Agent, this must not be changed in place. The preferences of
+        a WeightedAgent follow from its weights, so use add_weight, threshold,
+        trim_after_worst or remove_preference to change them.
         """
         self._sort_preferences()
         return self._preferences
 
     def weight_of(self, other):
         """Return the weight of matching self with the agent "other", or raises
-        an exception if this agent is not compatible with other.
+        a KeyError if this agent is not compatible with other.
         :param other: The ID of the agent whose weight you want
         :type other: integer
         :return: the weight of matching self with other
@@ -47,14 +59,51 @@ class WeightedAgent(Agent):
         """Remove any scores below the given threshold.
         :param threshold: The value under which no scores will be considered
         :type threshold: integer
+        :return: True if this agent has no preferences left
+        :rtype: bool
         """
         self._sort_preferences()
+        removed = False
         while (self._sorted_preferences and
                self._sorted_preferences[-1][1] < threshold):
             ident, _ = self._sorted_preferences.pop()
             del self._weights[ident]
-        self._num_preferences = None
-        self._build_preferences()
+            # The lowest scores are at the end of the last tie group, so trim
+            # that rather than rebuilding every group
+            self._preferences[-1].pop()
+            if not self._preferences[-1]:
+                self._preferences.pop()
+            removed = True
+        if removed:
+            self._preferences_changed()
+        return not self._preferences
+
+    def trim_after_worst(self, agents):
+        """Given a set of agents, trim this agents preference list by removing
+        anything that occurs after the worst agent in agents. The weights of
+        the removed agents are forgotten as well.
+        :param agents: An Iterable containing agent IDs
+        :return: The number of preferences removed
+        """
+        removed = super().trim_after_worst(agents)
+        if removed:
+            # The trimmed agents are the last ones in the sorted order, and
+            # threshold relies on the two staying in step
+            for ident, _ in self._sorted_preferences[-removed:]:
+                del self._weights[ident]
+            del self._sorted_preferences[-removed:]
+        return removed
+
+    def remove_preference(self, ident):
+        """Remove the agent identified by ident from the preferences of this
+        agent. The weight of the removed agent is forgotten as well.
+        :param ident: The ID of the agent to remove
+        """
+        self._sort_preferences()
+        self._weights.pop(ident, None)
+        self._sorted_preferences = [pref for pref in self._sorted_preferences
+                                    if pref[0] != ident]
+        super().remove_preference(ident)
 
     def better_than(self, ident):
         """Returns the list of WeightedAgent IDs that this agent prefers as good as, or
@@ -62,22 +111,28 @@ class WeightedAgent(Agent):
         :param ident: An ID for an WeightedAgent to compare to.
         :type ident: integer
         """
-        self._sort_preferences()
-        result = []
-        agent_score = None
-        for pref in self._sorted_preferences:
-            if pref[0] == ident:
-                agent_score = pref[1]
-            if agent_score is not None and pref[1] < agent_score:
-                return result
-            result.append(pref[0])
-        return result
+        if ident not in self._weights:
+            # Every acceptable agent is better than an unacceptable one
+            self._sort_preferences()
+            return [pref[0] for pref in self._sorted_preferences]
+        agent_score = self._weights[ident]
+        # Only sort the agents that make the cut, rather than all of them
+        better = [pref for pref in self._weights.items()
+                  if pref[1] >= agent_score]
+        better.sort(reverse=True, key=itemgetter(1))
+        return [pref[0] for pref in better]
 
     def preference_string(self):
-        """Returns the string of preferences for this agent."""
+        """Returns the string of preferences for this agent. The string is
+        remembered until the preferences or weights change, which is why the
+        preferences must not be edited in place (see preferences).
+        """
+        if self._preference_string is not None:
+            return self._preference_string
+
         def format_agent(ident):
             """Show an agent as their id and weight."""
-            return "%s (%f)" % (ident, self._weights[ident])
+            return f"{ident} ({self._weights[ident]:f})"
 
         def format_tie(tie_as_list):
             """Given a set of tied elements, returns a string representing
@@ -89,40 +144,35 @@ class WeightedAgent(Agent):
                 return format_agent(tie_as_list[0])
             return "(%s)" % (" ".join([format_agent(ident)
                                        for ident in tie_as_list]))
-        return " ".join([format_tie(tie) for tie in self.preferences])
+        self._preference_string = " ".join([format_tie(tie)
+                                            for tie in self.preferences])
+        return self._preference_string
 
     def _sort_preferences(self):
-        """Sorts the preferences by score, highest to lowest.
+        """Sorts the preferences by score, highest to lowest, unless they are
+        already sorted.
         """
-        # Do nothing if the list is already sorted.
         if self._sorted_preferences is not None:
             return
-        self._sorted_preferences = sorted(self._preference_weights,
+        self._sorted_preferences = sorted(self._weights.items(),
                                           reverse=True,
-                                          key=lambda x: x[1])
+                                          key=itemgetter(1))
         self._build_preferences()
 
     def _build_preferences(self):
         """Builds up the preferences structure from the _sorted_preferences
         structure.
         """
-        last_weight = None
-        self._preferences = []
-        group = []
-        for ident, weight in self._sorted_preferences:
-            if last_weight is not None and weight != last_weight:
-                self._preferences.append(group)
-                group = []
-            group.append(ident)
-            last_weight = weight
-        if group:
-            self._preferences.append(group)
+        self._preferences = [[ident for ident, _ in group]
+                             for _, group in groupby(self._sorted_preferences,
+                                                     key=itemgetter(1))]
+        self._preferences_changed()
 
     def __str__(self):
         """A human readable string representation of this Agent.
         """
         return (f"WeightedAgent {self._ident} with preferences: "
-                "{self.preference_string()}")
+                f"{self.preference_string()}")
 
 
 class WeightedInstance(Instance):
@@ -134,6 +184,9 @@ class WeightedInstance(Instance):
     :param rights: The other set of WeightedAgent objects
     :type rightss: Dict[:class:`WeightedAgent`]
     """
+
+    __slots__ = ()
+
     def __init__(self, lefts, rights):
         super().__init__(single_agents_left=lefts, single_agents_right=rights)
 
@@ -143,20 +196,13 @@ class WeightedInstance(Instance):
         :param threshold: The value under which no scores will be considered
         :type threshold: integer
         """
-        to_remove = []
-        for left in self._single_agents_left.values():
-            left.threshold(threshold)
-            if left.is_empty():
-                to_remove.append(left.ident)
-        for ident in to_remove:
-            del self._single_agents_left[ident]
-        to_remove = []
-        for right in self._single_agents_right.values():
-            right.threshold(threshold)
-            if right.is_empty():
-                to_remove.append(right.ident)
-        for ident in to_remove:
-            del self._single_agents_right[ident]
+        for agents in (self._single_agents_left, self._single_agents_right):
+            # Agents left with no preferences are removed afterwards, as we
+            # cannot delete from the dict while iterating over it.
+            to_remove = [ident for ident, agent in agents.items()
+                         if agent.threshold(threshold)]
+            for ident in to_remove:
+                del agents[ident]
 
     def weight(self, matching):
         """Get the weight of the given matching.
@@ -169,26 +215,27 @@ class WeightedInstance(Instance):
 
     @property
     def agents_left(self):
-        """Returns a list of the WeightedAgents on the left side of this SMTI instance.
-        :return: a list of WeightedAgents on the left side
-        :rtype: List[:class:`WeightedAgent`]
+        """Returns a view of the WeightedAgents on the left side of this SMTI
+        instance, as for single_agents_left.
+        :return: a view of the WeightedAgents on the left side
+        :rtype: Iterable[:class:`WeightedAgent`]
         """
-        return self._single_agents_left
+        return self.single_agents_left
 
     @property
     def agents_right(self):
-        """Returns a list of the WeightedAgents on the right side of this SMTI
-        instance.
-        :return: a list of WeightedAgents on the right side
-        :rtype: List[:class:`WeightedAgent`]
+        """Returns a view of the WeightedAgents on the right side of this SMTI
+        instance, as for single_agents_right.
+        :return: a view of the WeightedAgents on the right side
+        :rtype: Iterable[:class:`WeightedAgent`]
         """
-        return self.number_of_single_agents_right
+        return self.single_agents_right
 
     def __str__(self):
         """A human readable string representation of this instance.
         """
         return (f"WeightedInstance with {self.number_of_single_agents_left()} "
-                "single agents on the left, {self.number_of_couples_left()} "
+                f"single agents on the left, {self.number_of_couples_left()} "
                 "couples on the left and "
-                "{self.number_of_single_agents_right()} single agents "
+                f"{self.number_of_single_agents_right()} single agents "
                 "on the right")
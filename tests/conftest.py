@@ -0,0 +1,25 @@
+"""Shared fixtures for the test suite."""
+
+import pickle
+
+import pytest
+
+from pyhrtc.fileio import read_hrtc
+
+
+@pytest.fixture(scope="session")
+def instance_factory():
+    """A function that reads an instance from the given file. Each file is
+    only parsed once per test session, and every call returns a fresh copy so
+    that tests are free to modify their instance.
+    """
+    # Instances are kept pickled, as unpickling a fresh copy is several times
+    # faster than deepcopy on the larger instances
+    cache = {}
+
+    def read(filename):
+        if filename not in cache:
+            cache[filename] = pickle.dumps(read_hrtc(filename),
+                                           pickle.HIGHEST_PROTOCOL)
+        return pickle.loads(cache[filename])
+    return read
@@ -0,0 +1,49 @@
+"""Test cases for individual agents."""
+
+
+from pyhrtc.basics import Agent
+
+
+def test_rank_of():
+    """Ranks start at 1, and unacceptable agents have rank -1."""
+    agent = Agent("a")
+    agent.preferences = [["1"], ["2", "3"]]
+    assert agent.rank_of("1") == 1
+    assert agent.rank_of("3") == 2
+    assert agent.rank_of("4") == -1
+    assert agent.is_acceptable("2")
+    assert not agent.is_acceptable("4")
+
+
+def test_rank_of_duplicate():
+    """An agent listed twice has the rank of its first appearance."""
+    agent = Agent("a")
+    agent.preferences = [["1"], ["2"], ["1"]]
+    assert agent.rank_of("1") == 1
+
+
+def test_rank_of_after_change():
+    """Ranks follow the preferences when they are replaced or trimmed."""
+    agent = Agent("a")
+    agent.preferences = [["1"], ["2", "3"]]
+    assert agent.rank_of("2") == 2
+    agent.preferences = [["4"], ["1"]]
+    assert agent.rank_of("1") == 2
+    assert agent.rank_of("2") == -1
+    assert agent.is_acceptable("4")
+    agent.trim_after_worst(["4"])
+    assert agent.rank_of("1") == -1
+    assert not agent.is_acceptable("1")
+
+
+def test_preference_string_after_change():
+    """The preference string follows the preferences when they are replaced
+    or trimmed.
+    """
+    agent = Agent("a")
+    agent.preferences = [["1"], ["2", "3"]]
+    assert agent.preference_string() == "1 (2 3)"
+    agent.preferences = [["4", "1"], ["2"]]
+    assert agent.preference_string() == "(4 1) 2"
+    agent.trim_after_worst(["1"])
+    assert agent.preference_string() == "(4 1)"
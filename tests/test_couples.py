@@ -1,18 +1,14 @@
 """Test functions relating to couples."""
 
-from nose.tools import eq_
 
-from pyhrtc.fileio import read_hrtc
-
-
-def test_make_couple():
+def test_make_couple(instance_factory):
     """Create a couple in an instance, ensure numbers change.
     """
-    instance = read_hrtc("tests/testfiles/test1.instance")
-    eq_(instance.number_of_single_agents_left(), 2)
-    eq_(instance.number_of_couples_left(), 0)
-    eq_(instance.number_of_single_agents_right(), 2)
+    instance = instance_factory("tests/testfiles/test1.instance")
+    assert instance.number_of_single_agents_left() == 2
+    assert instance.number_of_couples_left() == 0
+    assert instance.number_of_single_agents_right() == 2
     instance.make_couple_from_agent_pair_on_left()
-    eq_(instance.number_of_single_agents_left(), 0)
-    eq_(instance.number_of_couples_left(), 1)
-    eq_(instance.number_of_single_agents_right(), 2)
+    assert instance.number_of_single_agents_left() == 0
+    assert instance.number_of_couples_left() == 1
+    assert instance.number_of_single_agents_right() == 2
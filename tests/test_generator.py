@@ -0,0 +1,23 @@
+"""Test cases for generating random instances."""
+
+
+import random
+
+from pyhrtc.generator import random_hrtc
+
+
+def test_random_hrtc_with_couples():
+    """Couples are made from pairs of generated residents."""
+    random.seed(0)
+    instance = random_hrtc(3, 4, number_of_couples=2, start_at_one=True)
+    assert instance.number_of_single_agents_left() == 4
+    assert instance.number_of_couples_left() == 2
+    assert instance.number_of_single_agents_right() == 3
+    # Each resident in a couple ranks all 3 hospitals. Interleaving gives one
+    # tie group for each pair of ranks i <= j, which holds both (i, j) and
+    # (j, i) unless i == j
+    for couple in instance.couples_left:
+        assert len(couple.preferences) == 6
+        assert couple.num_preferences == 9
+    assert sum(hospital.capacity
+               for hospital in instance.single_agents_right) == 8
@@ -1,36 +1,45 @@
 """Test cases for preprocessing."""
 
 
-from nose.tools import eq_
-
-from pyhrtc.fileio import read_hrtc
-
-
-def test_trims():
+def test_trims(instance_factory):
     """Test the trimming of preference lists
     """
-    instance = read_hrtc("tests/testfiles/test1.instance")
-    eq_(instance.number_of_single_agents_left(), 2)
-    eq_(instance.number_of_couples_left(), 0)
-    eq_(instance.number_of_single_agents_right(), 2)
+    instance = instance_factory("tests/testfiles/test1.instance")
+    assert instance.number_of_single_agents_left() == 2
+    assert instance.number_of_couples_left() == 0
+    assert instance.number_of_single_agents_right() == 2
     one = instance.single_agent_left("1")
-    eq_(len(list(one.acceptable_agents())), 2)
+    assert len(list(one.acceptable_agents())) == 2
     one.trim_after_worst(["1"])
-    eq_(len(list(one.acceptable_agents())), 1)
+    assert len(list(one.acceptable_agents())) == 1
 
 
-def test_preprocess():
+def test_preprocess(instance_factory):
     """Test that preprocessing works as expected.
     """
-    instance = read_hrtc("tests/testfiles/test1.instance")
-    eq_(instance.number_of_single_agents_left(), 2)
-    eq_(instance.number_of_couples_left(), 0)
-    eq_(instance.number_of_single_agents_right(), 2)
+    instance = instance_factory("tests/testfiles/test1.instance")
+    assert instance.number_of_single_agents_left() == 2
+    assert instance.number_of_couples_left() == 0
+    assert instance.number_of_single_agents_right() == 2
     one = instance.single_agent_left("1")
-    eq_(len(list(one.acceptable_agents())), 2)
+    assert len(list(one.acceptable_agents())) == 2
     count = instance.preprocess()
-    eq_(len(list(one.acceptable_agents())), 1)
-    eq_(count, 2)
-    eq_(len(list(instance.single_agent_left("2").acceptable_agents())), 1)
-    eq_(len(list(instance.single_agent_right("1").acceptable_agents())), 2)
-    eq_(len(list(instance.single_agent_right("2").acceptable_agents())), 0)
+    assert len(list(one.acceptable_agents())) == 1
+    assert count == 2
+    assert len(list(instance.single_agent_left("2").acceptable_agents())) == 1
+    assert len(list(instance.single_agent_right("1").acceptable_agents())) == 2
+    assert len(list(instance.single_agent_right("2").acceptable_agents())) == 0
+
+
+def test_preprocess_weighted(instance_factory):
+    """Agents removed while preprocessing a weighted instance are gone from
+    everything derived from the preferences.
+    """
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    instance.preprocess('L')
+    right = instance.single_agent_right("1")
+    assert right.preferences == [["3"], ["1"]]
+    assert right.preference_string() == "3 (83.000000) 1 (48.000000)"
+    assert right.rank_of("1") == 2
+    assert right.rank_of("2") == -1
+    assert right.better_than("2") == ["3", "1"]
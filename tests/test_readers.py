@@ -1,55 +1,69 @@
 """Test cases for reading files."""
 
 
-from nose.tools import eq_
+import pytest
 
 from pyhrtc.fileio import read_hrtc
 
 
-def test_reads():
-    """Read in test1.instance and test2.instance and check some parameters.
+@pytest.mark.parametrize("filename,singles_left,couples_left,singles_right", [
+    ("test1", 2, 0, 2),
+    ("test2", 2, 2, 2),
+    # SMTI-GRP with column/row headers
+    ("smti-grp-simple", 3, 0, 3),
+    # SMTI-GRP without the header row/column, but a header showing number of
+    # rows and columns instead
+    ("smti-grp-noheader", 3, 0, 3),
+    # An unbalanced SMTI-GRP instance
+    ("smti-grp-noheader-unbal", 2, 0, 3),
+    # Iain's format
+    ("hrtc-iain-small", 6, 2, 5),
+    ("hrtc-iain", 88, 11, 11),
+])
+def test_reads(instance_factory, filename, singles_left, couples_left,
+               singles_right):
+    """Read in an instance and check the number of each kind of agent."""
+    instance = instance_factory(f"tests/testfiles/{filename}.instance")
+    assert instance.number_of_single_agents_left() == singles_left
+    assert instance.number_of_couples_left() == couples_left
+    assert instance.number_of_single_agents_right() == singles_right
+
+
+@pytest.mark.parametrize("filename,left_weight,right_weight", [
+    ("smti-grp-simple", ("1", "1", 48), ("2", "3", 55)),
+    ("smti-grp-noheader", ("1", "1", 48), ("2", "3", 55)),
+    ("smti-grp-noheader-unbal", ("1", "1", 48), ("3", "2", 94)),
+])
+def test_reads_smti_grp_weights(instance_factory, filename, left_weight,
+                                right_weight):
+    """Test that SMTI-GRP instances have the right weights. Each weight is
+    given as the agent, the agent they rank, and the weight.
     """
-    instance = read_hrtc("tests/testfiles/test1.instance")
-    eq_(instance.number_of_single_agents_left(), 2)
-    eq_(instance.number_of_couples_left(), 0)
-    eq_(instance.number_of_single_agents_right(), 2)
-
-    instance = read_hrtc("tests/testfiles/test2.instance")
-    eq_(instance.number_of_single_agents_left(), 2)
-    eq_(instance.number_of_couples_left(), 2)
-    eq_(instance.number_of_single_agents_right(), 2)
-
-
-def test_reads_smti_grp():
-    """Test reading of SMTI-GRP instances."""
-    # With column/row headers
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
-    eq_(instance.number_of_single_agents_left(), 3)
-    eq_(instance.single_agent_left("1").weight_of("1"), 48)
-    eq_(instance.single_agent_right("2").weight_of("3"), 55)
-    eq_(instance.number_of_single_agents_right(), 3)
-    # Without the header row/column, but a header showing number of rows and
-    # columns instead
-    instance = read_hrtc("tests/testfiles/smti-grp-noheader.instance")
-    eq_(instance.number_of_single_agents_left(), 3)
-    eq_(instance.single_agent_left("1").weight_of("1"), 48)
-    eq_(instance.single_agent_right("2").weight_of("3"), 55)
-    eq_(instance.number_of_single_agents_right(), 3)
-    # An unbalanced instance.
-    instance = read_hrtc("tests/testfiles/smti-grp-noheader-unbal.instance")
-    eq_(instance.number_of_single_agents_left(), 2)
-    eq_(instance.single_agent_left("1").weight_of("1"), 48)
-    eq_(instance.single_agent_right("3").weight_of("2"), 94)
-    eq_(instance.number_of_single_agents_right(), 3)
-
-
-def test_reads_iain():
-    """Test reading of SMTI-GRP instances."""
-    instance = read_hrtc("tests/testfiles/hrtc-iain-small.instance")
-    eq_(instance.number_of_single_agents_left(), 6)
-    eq_(instance.number_of_couples_left(), 2)
-    eq_(instance.number_of_single_agents_right(), 5)
-    instance = read_hrtc("tests/testfiles/hrtc-iain.instance")
-    eq_(instance.number_of_single_agents_left(), 88)
-    eq_(instance.number_of_couples_left(), 11)
-    eq_(instance.number_of_single_agents_right(), 11)
+    instance = instance_factory(f"tests/testfiles/{filename}.instance")
+    left, other, weight = left_weight
+    assert instance.single_agent_left(left).weight_of(other) == weight
+    right, other, weight = right_weight
+    assert instance.single_agent_right(right).weight_of(other) == weight
+
+
+@pytest.mark.parametrize("filename", [
+    # Ends within the lines read while detecting the format
+    "test1-truncated",
+    # Ends after those lines, so the parser runs out of the rest of the file
+    "test2-truncated",
+])
+def test_reads_truncated(filename):
+    """A file that ends too early is reported, whether or not the format has
+    to be detected first."""
+    filename = f"tests/testfiles/{filename}.instance"
+    with pytest.raises(ValueError, match="end of file"):
+        read_hrtc(filename)
+    with pytest.raises(ValueError, match="end of file"):
+        read_hrtc(filename, "Glasgow_HRTC_nocolon")
+
+
+def test_weighted_agents_left_right(instance_factory):
+    """agents_left and agents_right give the agents on each side."""
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    assert [agent.ident for agent in instance.agents_left] == ["1", "2", "3"]
+    assert [agent.ident for agent in instance.agents_right] == ["1", "2", "3"]
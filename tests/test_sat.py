@@ -0,0 +1,43 @@
+"""Test cases for the SAT encoding."""
+
+
+from itertools import product
+
+import pytest
+
+from pyhrtc.sat import create_sat_smti
+
+
+def count_models(encoding):
+    """Count the satisfying assignments of a DIMACS CNF encoding by trying
+    every assignment, so only use this on tiny encodings.
+    """
+    lines = encoding.splitlines()
+    _, _, num_vars, num_clauses = lines[0].split()
+    clauses = [[int(literal) for literal in line.split()[:-1]]
+               for line in lines[1:]]
+    assert len(clauses) == int(num_clauses)
+    count = 0
+    for values in product((False, True), repeat=int(num_vars)):
+        if all(any(values[abs(literal) - 1] == (literal > 0)
+                   for literal in clause)
+               for clause in clauses):
+            count += 1
+    return count
+
+
+def test_sat_models_are_matchings(instance_factory):
+    """smti-tiny has acceptable pairs (1, 1), (1, 2) and (2, 1), so it has
+    five matchings, including the empty one.
+    """
+    instance = instance_factory("tests/testfiles/smti-tiny.instance")
+    encoding = create_sat_smti(instance)
+    assert encoding.startswith("p cnf 10 ")
+    assert count_models(encoding) == 5
+
+
+def test_sat_needs_smti(instance_factory):
+    """Instances with couples cannot be encoded."""
+    instance = instance_factory("tests/testfiles/test2.instance")
+    with pytest.raises(NotImplementedError):
+        create_sat_smti(instance)
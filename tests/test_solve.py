@@ -1,79 +1,77 @@
 """Test cases for solving SMTI instances."""
 
 
-from nose.tools import eq_
+import pytest
 
-from pyhrtc.fileio import read_hrtc
-from pyhrtc.models import MAX_SMTI_IP
+pytest.importorskip("pulp")
 
+from pulp import PULP_CBC_CMD
 
-def test_solve():
-    """Solve simple instance
-    """
-    instance = read_hrtc("tests/testfiles/smti-simple.instance")
-    model = MAX_SMTI_IP(instance)
-    matching = model.solve()
-    eq_(len(matching), 3)
-    instance = read_hrtc("tests/testfiles/smti-nocomplete.instance")
-    model = MAX_SMTI_IP(instance)
-    matching = model.solve()
-    eq_(len(matching), 2)
+from pyhrtc.models import MAX_SMTI_IP, ModelBuiltException
 
 
-def test_dummy_variables_simple():
-    """Solve simple instance using dummy variables
-    """
-    instance = read_hrtc("tests/testfiles/smti-simple.instance")
-    model = MAX_SMTI_IP(instance)
-    model.dummy_variables = True
-    matching = model.solve()
-    eq_(len(matching), 3)
+@pytest.fixture(scope="session")
+def solver():
+    """A single CBC solver, with its output silenced, shared by all tests."""
+    return PULP_CBC_CMD(msg=False)
 
 
-def test_grp_solve():
-    """Solve GRP instances
+@pytest.mark.parametrize("filename,threshold,dummy,weighted,expected", [
+    ("smti-simple", None, False, False, 3),
+    ("smti-nocomplete", None, False, False, 2),
+    # Dummy variables
+    ("smti-simple", None, True, False, 3),
+    # GRP instances
+    ("smti-grp-simple", None, False, False, 3),
+    ("smti-grp-simple", None, True, False, 3),
+    # GRP instances with thresholding
+    ("smti-grp-thresholds", None, False, False, 3),
+    ("smti-grp-thresholds", 80, False, False, 2),
+    ("smti-grp-thresholds", 80, False, True, 2),
+    # Weighted GRP instances
+    ("smti-grp-diff-maxweight", None, False, False, 4),
+    ("smti-grp-diff-maxweight", 5, False, True, 3),
+])
+def test_solve(instance_factory, solver, filename, threshold, dummy, weighted,
+               expected):
+    """Solve an instance, possibly after thresholding it, and check the size
+    of the matching found.
     """
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
+    instance = instance_factory(f"tests/testfiles/{filename}.instance")
+    if threshold is not None:
+        instance.threshold(threshold)
     model = MAX_SMTI_IP(instance)
-    matching = model.solve()
-    eq_(len(matching), 3)
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
-    model = MAX_SMTI_IP(instance)
-    model.dummy_variables = True
-    matching = model.solve()
-    eq_(len(matching), 3)
+    model.dummy_variables = dummy
+    model.weighted = weighted
+    matching = model.solve(solver)
+    assert len(matching) == expected
 
 
-def test_grp_thresholds():
-    """Solve GRP instances with thresholding
+def test_modify_after_build(instance_factory):
+    """Models cannot be changed once they are built
     """
-    instance = read_hrtc("tests/testfiles/smti-grp-thresholds.instance")
-    model = MAX_SMTI_IP(instance)
-    matching = model.solve()
-    eq_(len(matching), 3)
-    instance = read_hrtc("tests/testfiles/smti-grp-thresholds.instance")
-    instance.threshold(80)
-    model = MAX_SMTI_IP(instance)
-    matching = model.solve()
-    eq_(len(matching), 2)
-    instance = read_hrtc("tests/testfiles/smti-grp-thresholds.instance")
-    instance.threshold(80)
+    instance = instance_factory("tests/testfiles/smti-simple.instance")
     model = MAX_SMTI_IP(instance)
-    model.weighted = True
-    matching = model.solve()
-    eq_(len(matching), 2)
+    model.build_model()
+    with pytest.raises(ModelBuiltException):
+        model.dummy_variables = True
 
 
-def test_grp_solve_weighted():
-    """Solve GRP instances
+@pytest.mark.parametrize("threshold,expected", [
+    (None, 111),
+    (5, 110),
+])
+def test_solve_weighted_objective(instance_factory, solver, threshold,
+                                  expected):
+    """The objective of a weighted model is the weight of the matching found,
+    with each matched pair counted once.
     """
-    instance = read_hrtc("tests/testfiles/smti-grp-diff-maxweight.instance")
-    model = MAX_SMTI_IP(instance)
-    matching = model.solve()
-    eq_(len(matching), 4)
-    instance = read_hrtc("tests/testfiles/smti-grp-diff-maxweight.instance")
-    instance.threshold(5)
+    instance = instance_factory(
+        "tests/testfiles/smti-grp-diff-maxweight.instance")
+    if threshold is not None:
+        instance.threshold(threshold)
     model = MAX_SMTI_IP(instance)
     model.weighted = True
-    matching = model.solve()
-    eq_(len(matching), 3)
+    matching = model.solve(solver)
+    assert model.objective.value() == pytest.approx(expected)
+    assert instance.weight(matching) == pytest.approx(expected)
@@ -1,46 +1,70 @@
 """Test the thresholding functions."""
 
-from nose.tools import eq_, raises
+import pytest
 
-from pyhrtc.fileio import read_hrtc
 from pyhrtc.algorithms import max_card_matching
 
 
-def test_max_card_matching():
+def test_max_card_matching(instance_factory):
     """Test that max_card_matching changes
     """
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
-    eq_(max_card_matching(instance), 3)
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    assert max_card_matching(instance) == 3
     instance.threshold(50)
-    eq_(max_card_matching(instance), 2)
+    assert max_card_matching(instance) == 2
 
 
-def test_threshold_above_kept():
+def test_threshold_above_kept(instance_factory):
     """Ensure that scores above are not removed."""
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
-    eq_(instance.single_agent_left("1").weight_of("1"), 48)
-    eq_(instance.single_agent_right("2").weight_of("3"), 55)
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    assert instance.single_agent_left("1").weight_of("1") == 48
+    assert instance.single_agent_right("2").weight_of("3") == 55
     instance.threshold(50)
-    eq_(instance.single_agent_right("2").weight_of("3"), 55)
+    assert instance.single_agent_right("2").weight_of("3") == 55
 
 
-def test_empty_preferences():
+def test_empty_preferences(instance_factory):
     """Ensure that nothing breaks if we remove all preferences of an agent.
     """
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
-    eq_(instance.number_of_single_agents_right(), 3)
-    eq_(instance.single_agent_right("2").num_preferences, 3)
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    assert instance.number_of_single_agents_right() == 3
+    assert instance.single_agent_right("2").num_preferences == 3
     instance.threshold(50)
-    eq_(instance.number_of_single_agents_right(), 3)
-    eq_(instance.single_agent_right("2").num_preferences, 1)
+    assert instance.number_of_single_agents_right() == 3
+    assert instance.single_agent_right("2").num_preferences == 1
     instance.threshold(60)
-    eq_(instance.number_of_single_agents_right(), 2)
+    assert instance.number_of_single_agents_right() == 2
 
 
-@raises(Exception)
-def test_threshold_below_removed():
+def test_threshold_below_removed(instance_factory):
     """Ensure that scores below the threshold are removed."""
-    instance = read_hrtc("tests/testfiles/smti-grp-simple.instance")
-    eq_(instance.single_agent_left("1").weight_of("1"), 48)
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    assert instance.single_agent_left("1").weight_of("1") == 48
     instance.threshold(50)
-    eq_(instance.single_agent_left("1").weight_of("1"), 48)
+    agent = instance.single_agent_left("1")
+    with pytest.raises(KeyError):
+        agent.weight_of("1")
+
+
+def test_add_weight_after_sort(instance_factory):
+    """Weights added after the preferences are read must not be lost."""
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    agent = instance.single_agent_right("2")
+    assert agent.num_preferences == 3
+    agent.add_weight("4", 100)
+    assert agent.num_preferences == 4
+    assert agent.preferences[0] == ["4"]
+
+
+def test_threshold_after_trim(instance_factory):
+    """Thresholding must still work after preferences have been trimmed."""
+    instance = instance_factory("tests/testfiles/smti-grp-simple.instance")
+    agent = instance.single_agent_left("3")
+    assert agent.trim_after_worst(["1"]) == 1
+    assert agent.preferences == [["1", "3"]]
+    with pytest.raises(KeyError):
+        agent.weight_of("2")
+    assert not agent.threshold(60)
+    assert agent.preferences == [["1", "3"]]
+    assert agent.threshold(84)
+    assert agent.preferences == []